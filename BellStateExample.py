@@ -4,9 +4,9 @@
 # example of quantum entanglement and superposition.
 
 # 1. Import necessary libraries from Qiskit
-from qiskit import QuantumCircuit, transpile
-from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
+import os
+from simulators import get_simulator, transpile_once
+from qiskit import QuantumCircuit
 
 # 2. Create a quantum circuit with 2 qubits and 2 classical bits
 # Qubits are for quantum operations, classical bits are for storing measurement results.
@@ -27,10 +27,17 @@ print("Quantum Circuit for Bell State:")
 print(qc.draw())
 
 # 6. Run the simulation
-# Use the AerSimulator to execute the circuit.
-simulator = AerSimulator()
-compiled_circuit = transpile(qc, simulator)
-job = simulator.run(compiled_circuit, shots=1024) # Run the circuit 1024 times
+# Use the shared AerSimulator (see simulators.py) to execute the circuit.
+simulator = get_simulator()
+# On the CPU, run with a single thread, since for a 2-qubit state the cost of
+# starting threads is far more than the work they would share.
+run_options = {}
+if simulator.options.device == 'CPU':
+    run_options = {'max_parallel_threads': 1}
+# transpile_once caches the compiled circuit, so code that reuses this circuit
+# in the same process skips transpiling it again.
+compiled_circuit = transpile_once(qc, simulator)
+job = simulator.run(compiled_circuit, shots=1024, **run_options) # Run the circuit 1024 times
 
 # 7. Get and display the results
 result = job.result()
@@ -41,12 +48,14 @@ print(counts)
 # In an ideal simulation, you will see roughly 50% of the measurements as '00'
 # and 50% as '11', demonstrating the entanglement. You will never see '01' or '10'.
 
-# 8. Plot the results as a histogram
+# 8. Plot the results as a histogram (only when QML_PLOT=1 is set)
 # This requires matplotlib to be installed (`pip install matplotlib`)
-print("\nPlotting results...")
-plot = plot_histogram(counts, title='Bell State Measurement Results')
-# To display the plot, you might need to call plot.show() if not in an interactive environment
-try:
-    plot.show()
-except Exception as e:
-    print(f"Could not display plot. You may need to run 'plot.show()'. Error: {e}")
+if os.environ.get('QML_PLOT', '0') == '1':
+    from qiskit.visualization import plot_histogram
+    print("\nPlotting results...")
+    plot = plot_histogram(counts, title='Bell State Measurement Results')
+    # To display the plot, you might need to call plot.show() if not in an interactive environment
+    try:
+        plot.show()
+    except Exception as e:
+        print(f"Could not display plot. You may need to run 'plot.show()'. Error: {e}")
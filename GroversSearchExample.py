@@ -1,17 +1,39 @@
 # grovers_search.py
 #
 # This script implements Grover's algorithm, a quantum algorithm for unstructured
-# search. This example finds the state |11> in a 2-qubit system.
+# search. This example finds the state |11> in a 2-qubit system, and also runs
+# the search for every other marked state as a check.
 
-from qiskit import QuantumCircuit, transpile
-from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
+import functools
+import math
+import os
+from simulators import get_simulator, transpile_once
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import MCXGate, UnitaryGate
 import numpy as np
 
 # --- Helper function to create the diffuser ---
+# The diffuser only depends on n, so build it once per size and reuse it.
+@functools.lru_cache(maxsize=None)
 def diffuser(nqubits):
-    """Creates the Grover diffuser circuit for n qubits."""
-    qc = QuantumCircuit(nqubits)
+    """Creates the Grover diffuser 2|s><s| - I for n qubits, as a gate named "Diffuser".
+
+    The same gate object is returned for every call with the same n, so callers
+    must not modify it.
+    """
+    qc = QuantumCircuit(nqubits, name="Diffuser")
+    # For small n, build the diffuser's dense unitary 2|s><s| - I directly
+    # (|s> is the uniform superposition) and apply it as a single gate. It is
+    # wrapped in the "Diffuser" circuit rather than renamed, because the simulator
+    # only runs it as one matrix while the gate keeps its "unitary" name.
+    if nqubits <= 6:
+        s = np.full(2**nqubits, 1 / np.sqrt(2**nqubits))
+        U = 2 * np.outer(s, s) - np.eye(2**nqubits)
+        qc.append(UnitaryGate(U), range(nqubits))
+        return qc.to_gate()
+    # Otherwise use H/X gates around a multi-controlled Z. That sequence gives
+    # -(2|s><s| - I), so add a global phase of pi to match the matrix above.
+    qc.global_phase = np.pi
     # Apply Hadamard to all qubits
     for qubit in range(nqubits):
         qc.h(qubit)
@@ -20,7 +42,7 @@ def diffuser(nqubits):
         qc.x(qubit)
     # Apply multi-controlled Z gate
     qc.h(nqubits - 1)
-    qc.mct(list(range(nqubits - 1)), nqubits - 1)  # Multi-controlled Toffoli
+    qc.append(MCXGate(nqubits - 1), range(nqubits))  # Multi-controlled Toffoli
     qc.h(nqubits - 1)
     # Apply X to all qubits
     for qubit in range(nqubits):
@@ -29,9 +51,59 @@ def diffuser(nqubits):
     for qubit in range(nqubits):
         qc.h(qubit)
     # Return the diffuser as a gate
-    U_s = qc.to_gate()
-    U_s.name = "Diffuser"
-    return U_s
+    return qc.to_gate()
+
+# --- Helper function to create the oracle ---
+def oracle(marked_state):
+    """Creates the phase oracle that marks the basis state |marked_state>."""
+    nqubits = len(marked_state)
+    qc = QuantumCircuit(nqubits, name="Oracle")
+    # Qiskit orders bits right-to-left, so qubit i is marked_state[-1 - i].
+    # Flip the qubits that should be 0 so the marked state becomes |11...1>.
+    zeros = [qubit for qubit, bit in enumerate(reversed(marked_state)) if bit == '0']
+    for qubit in zeros:
+        qc.x(qubit)
+    # Flip the phase of |11...1> (for 2 qubits this is just a controlled-Z)
+    if nqubits == 2:
+        qc.cz(0, 1)
+    else:
+        qc.h(nqubits - 1)
+        qc.append(MCXGate(nqubits - 1), range(nqubits))
+        qc.h(nqubits - 1)
+    # Undo the X gates
+    for qubit in zeros:
+        qc.x(qubit)
+    return qc.to_gate()
+
+# --- Helper function to build the full Grover circuit ---
+def grover_circuit(marked_state, iterations):
+    """Builds Grover's search for |marked_state>, with measurements."""
+    nqubits = len(marked_state)
+    qc = QuantumCircuit(nqubits, nqubits, name=f"grover_{marked_state}")
+    # Start with a uniform superposition
+    qc.h(range(nqubits))
+    qc.barrier()
+    # One Grover iteration is always Oracle followed by Diffuser, so fuse them into a
+    # single gate once and append that gate for each iteration.
+    iter_qc = QuantumCircuit(nqubits, name='GroverIter')
+    iter_qc.append(oracle(marked_state), range(nqubits))
+    iter_qc.append(diffuser(nqubits), range(nqubits))
+    grover_iter = iter_qc.to_gate(label='GroverIter')
+    for _ in range(iterations):
+        qc.append(grover_iter, range(nqubits))
+        qc.barrier()
+    # Measure the qubits
+    qc.measure(range(nqubits), range(nqubits))
+    return qc
+
+# --- Helper function to strip barriers before simulating ---
+def without_barriers(qc):
+    """Returns a copy of the circuit with its (purely visual) barriers removed."""
+    sim_qc = qc.copy_empty_like()
+    for instr in qc.data:
+        if instr.operation.name != 'barrier':
+            sim_qc.append(instr)
+    return sim_qc
 
 # --- Main script ---
 # 1. Define the search space size (number of qubits)
@@ -39,53 +111,59 @@ n = 2
 # The state we want to find
 marked_state = '11'
 
-# 2. Create the Oracle for the marked state |11>
-# The oracle "marks" the solution by flipping its phase.
-# For |11>, a controlled-Z gate does this perfectly.
-oracle = QuantumCircuit(n, name="Oracle")
-oracle.cz(0, 1) # Flips the phase of |11>
-oracle_gate = oracle.to_gate()
-
-# 3. Build the main Grover circuit
-grover_circuit = QuantumCircuit(n, n)
-
-# 4. Start with a uniform superposition
-grover_circuit.h(range(n))
-grover_circuit.barrier()
-
-# 5. Determine the optimal number of iterations
+# 2. Determine the optimal number of iterations
 # For N items (2^n), the optimal number is approx. (pi/4)*sqrt(N)
-iterations = int(np.floor(np.pi / 4 * np.sqrt(2**n)))
+iterations = math.floor(math.pi / 4 * math.sqrt(2**n))
 print(f"Number of qubits: {n}")
 print(f"Marked state: |{marked_state}>")
 print(f"Optimal number of Grover iterations: {iterations}")
 
-# 6. Apply Grover's algorithm (Oracle + Diffuser) for the optimal number of times
-for _ in range(iterations):
-    grover_circuit.append(oracle_gate, [0, 1])
-    grover_circuit.append(diffuser(n), range(n))
-    grover_circuit.barrier()
+# 3. Build the Grover circuit
+# The oracle "marks" the solution by flipping its phase; the diffuser then
+# amplifies the marked state. See the helper functions above.
+circuit = grover_circuit(marked_state, iterations)
 
-# 7. Measure the qubits
-grover_circuit.measure(range(n), range(n))
-
-# 8. Draw the circuit
+# 4. Draw the circuit
 print("\nGrover's Search Circuit:")
-print(grover_circuit.draw())
+print(circuit.draw())
+
+# 5. Build one circuit per possible marked state, so the search can be checked
+# for every state, not just |11>.
+all_states = [format(i, f'0{n}b') for i in range(2**n)]
+circuits = [circuit if state == marked_state else grover_circuit(state, iterations)
+            for state in all_states]
 
-# 9. Simulate the circuit
-simulator = AerSimulator()
-compiled_circuit = transpile(grover_circuit, simulator)
-job = simulator.run(compiled_circuit, shots=1024)
+# 6. Simulate the circuits
+# The circuits are independent, so the shared AerSimulator (see simulators.py)
+# runs them in parallel as one job. (No thread limit is set here, so Aer can use
+# its threads to run the experiments side by side.)
+simulator = get_simulator()
+# Barriers only matter for the drawing above, so drop them before simulating.
+# (transpile_once caches the compiled circuits, so code that runs the same
+# searches again in this process skips transpiling them.)
+compiled_circuits = [transpile_once(without_barriers(qc), simulator) for qc in circuits]
+shots = 1024
+job = simulator.run(compiled_circuits, shots=shots,
+                    max_parallel_experiments=len(compiled_circuits))
 result = job.result()
-counts = result.get_counts(grover_circuit)
+counts = result.get_counts(circuit)
 
-# 10. Print and plot the results
+# 7. Print and plot the results
 print("\nSimulation Results:")
 print(counts)
 # The result should show a high probability of measuring the marked state '11'.
-plot = plot_histogram(counts, title="Grover's Search Results")
-try:
-    plot.show()
-except Exception as e:
-    print(f"\nCould not display plot. You may need to run 'plot.show()'. Error: {e}")
+print("\nResults for every marked state:")
+# Only the |11> search is shown as bitstrings; the others are just checked, so
+# look their marked state up directly in Aer's hex-keyed counts ({'0x3': 1024}).
+for i, state in enumerate(all_states):
+    hits = result.data(i)['counts'].get(hex(int(state, 2)), 0)
+    print(f"|{state}>: found {hits} of {shots} times")
+    assert hits > 0.8 * shots, f"Grover's search did not find |{state}>"
+# Plotting needs matplotlib, so only do it when QML_PLOT=1 is set.
+if os.environ.get('QML_PLOT', '0') == '1':
+    from qiskit.visualization import plot_histogram
+    plot = plot_histogram(counts, title="Grover's Search Results")
+    try:
+        plot.show()
+    except Exception as e:
+        print(f"\nCould not display plot. You may need to run 'plot.show()'. Error: {e}")
@@ -5,10 +5,8 @@
 # entanglement and classical communication.
 
 import numpy as np
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
-from qiskit_aer import AerSimulator
-from qiskit.visualization import plot_histogram
-from qiskit.quantum_info import random_statevector
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit.quantum_info import Statevector
 
 # --- Setup ---
 # Create the registers
@@ -19,13 +17,49 @@ q_entangled = QuantumRegister(2, name="epr")
 # c_classical is for classical communication
 c_classical = ClassicalRegister(2, name="classical_bits")
 
+# Alice measures each of her qubits into one classical bit, and each bit tells Bob
+# which correction to apply: bit 0 (the source qubit) calls for a Z, bit 1 (her
+# entangled half) calls for an X. Bob applies the X before the Z.
+measured_qubits = {0: q_source[0], 1: q_entangled[0]}
+corrections = [(1, 'x'), (0, 'z')]
+
+# --- Helper function to apply Bob's corrections ---
+def apply_corrections(circuit, deferred=False):
+    """Adds Bob's corrections to his qubit (q_entangled[1]).
+
+    By default they are controlled by the classical bits Alice sent. With
+    deferred=True they are controlled directly by Alice's qubits instead (the
+    deferred-measurement form), which needs no measurements.
+    """
+    bob = q_entangled[1]
+    if deferred:
+        for bit, gate in corrections:
+            getattr(circuit, 'c' + gate)(measured_qubits[bit], bob)
+        return
+    # A single switch on the 2-bit register covers every case:
+    # 00 -> I, 01 -> Z, 10 -> X, 11 -> X then Z.
+    with circuit.switch(c_classical) as case:
+        for value in range(1, 4):
+            with case(value):
+                for bit, gate in corrections:
+                    if value >> bit & 1:
+                        getattr(circuit, gate)(bob)
+
 # Create the main circuit
 qc = QuantumCircuit(q_source, q_entangled, c_classical)
 
 # --- Step 1: Create an initial state to teleport ---
-# Let's create a random quantum state for our source qubit.
-random_ket = random_statevector(2)
-qc.initialize(random_ket, q_source[0])
+# Let's create a random quantum state for our source qubit, by picking a
+# uniformly random point (theta, phi) on the Bloch sphere.
+rng = np.random.default_rng(0)
+u1, u2 = rng.random(2)
+theta = 2 * np.arccos(np.sqrt(u1))
+phi = 2 * np.pi * u2
+random_ket = Statevector(np.array([np.cos(theta / 2), np.exp(1j * phi) * np.sin(theta / 2)]))
+# cos(theta/2)|0> + e^(i*phi) sin(theta/2)|1> is (up to a global phase) RZ(phi) RY(theta) |0>,
+# so prepare it with two rotations instead of the generic qc.initialize.
+qc.ry(theta, q_source[0])
+qc.rz(phi, q_source[0])
 qc.barrier()
 
 # --- Step 2: Create an entangled Bell pair ---
@@ -43,17 +77,13 @@ qc.barrier()
 
 # --- Step 4: Sender measures and sends classical info ---
 # Alice measures her two qubits (the source and her entangled half).
-qc.measure(q_source[0], c_classical[0])
-qc.measure(q_entangled[0], c_classical[1])
+for bit, qubit in measured_qubits.items():
+    qc.measure(qubit, c_classical[bit])
 qc.barrier()
 
 # --- Step 5: Receiver's operations (controlled by classical info) ---
 # The receiver (Bob) applies gates to his qubit based on the classical bits he received.
-with qc.if_test((c_classical, 1)): # If the second classical bit is 1, apply X gate
-    qc.x(q_entangled[1])
-with qc.if_test((c_classical, 2)): # If the first classical bit is 1, apply Z gate
-    qc.z(q_entangled[1])
-
+apply_corrections(qc)
 
 # The state of Bob's qubit (q_entangled[1]) should now be identical to the
 # initial random state of the source qubit.
@@ -66,24 +96,40 @@ print(qc.draw())
 # --- Verification (using a simulator) ---
 # We can use a statevector simulator to verify that the final state of Bob's qubit
 # matches the initial state of the source qubit.
-from qiskit.quantum_info import Statevector
 
-# Simulate the circuit to get the final statevector
-sv_sim = AerSimulator(method='statevector')
-final_statevector = sv_sim.run(qc).result().get_statevector()
+# Statevector evolves the circuit directly with NumPy, but it cannot simulate
+# measurements or classically-controlled gates. So what gets checked is the
+# deferred-measurement version of the drawn circuit: the measurements are dropped,
+# and Bob's corrections (from the same apply_corrections helper) are controlled
+# directly by Alice's qubits.
+sim_qc = QuantumCircuit(q_source, q_entangled)
+for instr in qc.data:
+    if instr.operation.name not in ('barrier', 'measure', 'switch_case'):
+        sim_qc.append(instr)
+apply_corrections(sim_qc, deferred=True)
+final_statevector = Statevector(sim_qc)
 
 # The final state of Bob's qubit is in the last qubit's subspace.
 # Because Qiskit's bit ordering is right-to-left, the last qubit is the first one.
-# We need to extract this part of the statevector.
-from qiskit.quantum_info import partial_trace
-bob_final_state = partial_trace(final_statevector, [0, 1])
+# We need to extract this part of the statevector: view it as a (bob, alice_epr, source)
+# tensor and sum over Alice's two qubits to get Bob's 2x2 density matrix.
+psi = np.asarray(final_statevector.data).reshape(2, 2, 2)
+bob_final_state = np.einsum('ijk,ljk->il', psi, psi.conj())
+
+init = np.asarray(random_ket.data, dtype=np.complex128)
+final = np.asarray(bob_final_state, dtype=np.complex128)
+
+print("\n--- Verification (deferred-measurement version of the circuit) ---")
+print("Initial state of source qubit:\n", init)
+print("\nFinal state of Bob's qubit:\n", final)
 
-print("\n--- Verification ---")
-print("Initial state of source qubit:\n", random_ket.data)
-print("\nFinal state of Bob's qubit:\n", bob_final_state.data)
+# Bob's qubit is described by a density matrix, so compare it with |init><init|
+# (which also ignores any global phase) and report the fidelity <init|rho|init>.
+fidelity = np.real(init.conj() @ final @ init)
+print(f"\nFidelity: {fidelity:.6f}")
 
 # Check if they are close (allowing for small floating point errors)
-if np.allclose(random_ket.data, bob_final_state.data):
+if np.allclose(np.outer(init, init.conj()), final, rtol=1e-6, atol=1e-7):
     print("\nSuccess! The state was teleported correctly.")
 else:
     print("\nFailure. The states do not match.")
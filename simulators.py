@@ -0,0 +1,134 @@
+# simulators.py
+#
+# This module gives the example scripts a common, lazily created AerSimulator and
+# a cache of transpiled circuits. Both live for one Python process: every
+# get_simulator() call in that process returns the same simulator (so, on CUDA
+# builds, the GPU context is set up once), and recently transpiled circuits are
+# not transpiled again. Running the example scripts as separate commands still
+# creates one simulator per script; they only share it when imported into the
+# same process.
+#
+# The first get_simulator() call also defaults CUDA_VISIBLE_DEVICES to the first
+# GPU. That only works if qiskit_aer has not been imported before that call, so
+# this module imports qiskit_aer inside get_simulator() rather than at the top.
+
+import collections
+import os
+
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import ControlFlowOp, Gate, Instruction
+
+_simulator = None
+
+def get_simulator(**kw):
+    """Returns the shared AerSimulator, creating it on the first call.
+
+    Keyword options are applied when the simulator is first created. Later calls
+    may repeat them, but raise ValueError if they ask for a different value.
+    """
+    global _simulator
+    if _simulator is not None:
+        for name, value in kw.items():
+            current = getattr(_simulator.options, name, None)
+            if current != value:
+                raise ValueError(
+                    f"The shared simulator already exists with {name}={current!r}; "
+                    f"cannot change it to {value!r}")
+        return _simulator
+    # With a CUDA build, creating the first AerSimulator initializes every visible
+    # GPU. Only expose the first one unless the user has already chosen.
+    os.environ.setdefault('CUDA_VISIBLE_DEVICES', '0')
+    from qiskit_aer import AerSimulator
+    _simulator = AerSimulator()
+    # Single precision is plenty for these small demos and much faster on most GPUs.
+    if 'GPU' in _simulator.available_devices():
+        # Batch all shots of a circuit into a single GPU kernel launch.
+        _simulator.set_options(method='statevector', device='GPU', precision='single',
+                               batched_shots_gpu=True, batched_shots_gpu_max_qubits=16)
+    else:
+        _simulator.set_options(method='statevector', precision='single')
+    _simulator.set_options(**kw)
+    return _simulator
+
+def _circuit_key(qc):
+    """Returns a hashable description of the circuit's contents, ignoring its name.
+
+    Custom gates (built with to_gate()/to_instruction()) are described by their
+    definitions, since different gates may share a name such as "Oracle". Library
+    gates are described by their class, parameters and control state. Returns None
+    for circuits the key cannot describe (e.g. control flow); those are not cached.
+    """
+    parts = [qc.num_qubits, qc.num_clbits, qc.global_phase,
+             tuple((reg.name, reg.size) for reg in qc.qregs),
+             tuple((reg.name, reg.size) for reg in qc.cregs)]
+    for instr in qc.data:
+        op = instr.operation
+        if isinstance(op, ControlFlowOp):
+            return None
+        if type(op) in (Gate, Instruction):
+            if op.definition is None:
+                return None
+            desc = _circuit_key(op.definition)
+            if desc is None:
+                return None
+        else:
+            desc = (type(op).__module__, type(op).__qualname__,
+                    tuple((p.shape, p.tobytes()) if isinstance(p, np.ndarray) else p
+                          for p in op.params),
+                    getattr(op, 'ctrl_state', None))
+        parts.append((op.name, op.num_qubits, op.num_clbits, desc,
+                      tuple(qc.find_bit(q).index for q in instr.qubits),
+                      tuple(qc.find_bit(c).index for c in instr.clbits)))
+    key = tuple(parts)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+# Least-recently-used cache of compiled circuits, keyed on (_circuit_key, simulator)
+_transpile_cache = collections.OrderedDict()
+_TRANSPILE_CACHE_SIZE = 32
+
+def transpile_once(qc, simulator):
+    """Transpiles a circuit for the simulator, reusing the result for identical circuits.
+
+    This pays off when the same circuit is transpiled more than once in a process
+    (e.g. when the examples are used as building blocks); a single run of an
+    example script transpiles each circuit only once.
+
+    Circuits that differ only in their name share a cache entry. Each caller gets
+    its own copy of the compiled circuit, carrying the name of the circuit passed in.
+    """
+    key = _circuit_key(qc)
+    if key is None:
+        return transpile(qc, simulator)
+    key = (key, simulator)
+    if key in _transpile_cache:
+        _transpile_cache.move_to_end(key)
+    else:
+        if len(_transpile_cache) >= _TRANSPILE_CACHE_SIZE:
+            # Drop the least recently used entry
+            _transpile_cache.popitem(last=False)
+        _transpile_cache[key] = transpile(qc, simulator)
+    return _transpile_cache[key].copy(name=qc.name)
+
+if __name__ == '__main__':
+    # Self-check: circuits built from different custom gates that share a name
+    # must get their own cache entries, whatever order the gates come in.
+    import itertools
+    from qiskit.quantum_info import Operator
+    bodies = []
+    for add_gate in (QuantumCircuit.x, QuantumCircuit.h, QuantumCircuit.s):
+        body = QuantumCircuit(1, name='G')
+        add_gate(body, 0)
+        bodies.append(body)
+    simulator = get_simulator()
+    for order in itertools.product(range(3), repeat=3):
+        qc = QuantumCircuit(1)
+        for i in order:
+            qc.append(bodies[i].to_gate(), [0])
+        assert Operator(transpile_once(qc, simulator)).equiv(Operator(qc)), order
+    assert len(_transpile_cache) == 27, len(_transpile_cache)
+    print("Transpile cache check passed.")